@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Detección de capacidades del sistema (Docker, Docker Compose y GPU NVIDIA)
+compartida por test_comparison_setup.py y generate_tts_comparison_report.py.
+
+El resultado se guarda unos segundos en un fichero temporal para que ejecutar
+la verificación y justo después la comparación no repita los mismos comandos.
+"""
+
+import os
+import json
+import time
+import tempfile
+import functools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+# Comandos externos de verificación; se lanzan todos a la vez
+PROBES = {
+    "docker": ['docker', '--version'],
+    "compose": ['docker', 'compose', 'version'],
+    "gpu": ['nvidia-smi'],
+}
+PROBE_TIMEOUT = 5  # segundos
+
+# Un fichero por usuario: el directorio temporal puede ser compartido (/tmp)
+_CACHE_OWNER = os.getuid() if hasattr(os, "getuid") else None
+CACHE_FILE = Path(tempfile.gettempdir()) / (
+    f"tts_caps_{_CACHE_OWNER}.json" if _CACHE_OWNER is not None else "tts_caps.json"
+)
+CACHE_TTL = 60  # segundos
+
+class Capabilities(NamedTuple):
+    """Capacidades del sistema detectadas al inicio"""
+    docker_version: Optional[str]
+    compose: bool
+    has_gpu: bool
+    gpu_driver: Optional[str] = None
+
+def _run_probe(args):
+    """Ejecuta un comando de verificación; None si no existe o no responde"""
+    try:
+        return subprocess.run(args, capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _detect() -> Capabilities:
+    """Lanza en paralelo todos los comandos de verificación"""
+    with ThreadPoolExecutor(max_workers=len(PROBES)) as executor:
+        futures = {name: executor.submit(_run_probe, args) for name, args in PROBES.items()}
+    results = {name: future.result() for name, future in futures.items()}
+
+    def ok(name: str) -> bool:
+        return results[name] is not None and results[name].returncode == 0
+
+    gpu_driver = None
+    if ok("gpu"):
+        for line in results["gpu"].stdout.split('\n'):
+            if 'Driver Version' in line:
+                gpu_driver = line.strip()
+                break
+
+    return Capabilities(
+        docker_version=results["docker"].stdout.strip() if ok("docker") else None,
+        compose=ok("compose"),
+        has_gpu=ok("gpu"),
+        gpu_driver=gpu_driver
+    )
+
+def _load_cache(max_age: float) -> Optional[Capabilities]:
+    """Lee el resultado guardado si tiene menos de `max_age` segundos"""
+    if max_age <= 0:
+        return None
+    try:
+        st = os.stat(CACHE_FILE)
+        # Solo se confía en un fichero propio y reciente
+        if _CACHE_OWNER is not None and st.st_uid != _CACHE_OWNER:
+            return None
+        if time.time() - st.st_mtime > max_age:
+            return None
+        with open(CACHE_FILE, encoding='utf-8') as f:
+            return Capabilities(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+def _save_cache(caps: Capabilities):
+    """Guarda el resultado de forma atómica; los fallos se ignoran"""
+    tmp_path = CACHE_FILE.with_name(f".{CACHE_FILE.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(caps._asdict(), f)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+@functools.lru_cache(maxsize=None)
+def get_capabilities(max_age: float = CACHE_TTL) -> Capabilities:
+    """Capacidades del sistema; reutiliza la última detección si es reciente (max_age=0 fuerza detectar)"""
+    caps = _load_cache(max_age)
+    if caps is None:
+        caps = _detect()
+        _save_cache(caps)
+    return caps
@@ -9,39 +9,148 @@ Versión con Audio: 2025-06-25
 """
 
 import os
+import argparse
+import errno
 import sys
 import time
 import json
 import subprocess
 import threading
 import requests
+from requests.adapters import HTTPAdapter
 import psutil
+import numpy as np
 import datetime
 import shutil
-import glob
+import string
+import contextlib
+import functools
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import IO, Dict, List, Any, Optional
+
+from capabilities import Capabilities, get_capabilities
 
 print("🎯 Script de Comparación TTS iniciando...")
 
-# Verificar dependencias
+# NVML es opcional: si no está instalado se recurre a nvidia-smi
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+# orjson es opcional: (de)serializa JSON en C; si falta se usa el módulo json
 try:
-    import statistics
+    import orjson
 except ImportError:
-    print("📦 Instalando dependencias...")
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'psutil', 'requests'])
-    import statistics
+    orjson = None
+
+def _json_loads(data: bytes) -> Any:
+    """Decodifica JSON desde bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _json_dumps(data: Any, compact: bool = False) -> bytes:
+    """Serializa a JSON indentado, o compacto para consumo automático (UTF-8, sin escapar caracteres no ASCII)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS if compact else orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        return orjson.dumps(data, option=option)
+    if compact:
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+@contextlib.contextmanager
+def _atomic_open(path: Path, mode: str = 'wb', **kwargs):
+    """Abre un temporal junto a `path` y lo renombra sobre él solo si la escritura termina bien"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+@functools.lru_cache(maxsize=None)
+def _docker_client():
+    """Cliente del daemon de Docker compartido por todos los modelos
+    
+    El SDK es opcional y se importa solo al primer uso (su carga es lenta);
+    devuelve None si no está instalado o el daemon no responde.
+    """
+    try:
+        import docker
+        return docker.from_env()
+    except Exception:
+        return None
 
 class ResourceMonitor:
     """Monitor de recursos del sistema durante las pruebas"""
     
-    def __init__(self):
-        self.monitoring = False
-        self.data = []
-        self.gpu_available = self._check_gpu()
+    SAMPLE_INTERVAL = 2.0  # segundos entre muestras
+    INITIAL_CAPACITY = 4096  # muestras preasignadas (~2 horas)
+    # Una fila contigua por métrica en el buffer de muestras
+    COLUMNS = ("cpu_percent", "memory_percent", "memory_used_gb",
+               "gpu_util", "gpu_memory", "gpu_temp")
+    
+    def __init__(self, gpu_available: Optional[bool] = None):
+        self._reset_samples()
+        # La RAM total no cambia durante la ejecución
+        self._mem_total_gb = psutil.virtual_memory().total / (1024**3)
+        # NVML se abre en start_monitoring y se libera en stop_monitoring
+        self._gpu_handle = None
+        # Si ya se conocen las capacidades detectadas al inicio no se vuelve a sondear
+        if gpu_available is None:
+            self.gpu_available = self._check_gpu()
+        else:
+            self.gpu_available = gpu_available
         
+    def _reset_samples(self):
+        """Vacía el buffer de muestras"""
+        self._samples = np.empty((len(self.COLUMNS), self.INITIAL_CAPACITY), dtype=np.float32)
+        self._n = 0
+    
+    def _store_sample(self, values: tuple):
+        """Guarda una muestra, ampliando el buffer si está lleno"""
+        if self._n == self._samples.shape[1]:
+            self._samples = np.concatenate((self._samples, np.empty_like(self._samples)), axis=1)
+        self._samples[:, self._n] = values
+        self._n += 1
+    
+    def _nvml_open(self) -> bool:
+        """Inicializa NVML y obtiene el handle de la GPU 0"""
+        try:
+            pynvml.nvmlInit()
+            self._gpu_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            return True
+        except Exception:
+            self._gpu_handle = None
+            return False
+    
+    def _nvml_close(self):
+        """Libera NVML si estaba inicializado"""
+        if self._gpu_handle is None:
+            return
+        try:
+            pynvml.nvmlShutdown()
+        except Exception:
+            pass
+        self._gpu_handle = None
+    
     def _check_gpu(self) -> bool:
         """Verifica si hay GPU disponible"""
+        # En Linux basta con comprobar el driver, sin lanzar nvidia-smi
+        if os.path.exists('/dev/nvidia0') or os.path.exists('/proc/driver/nvidia/version'):
+            return True
+        
         try:
             result = subprocess.run(['nvidia-smi'], capture_output=True, text=True)
             return result.returncode == 0
@@ -53,14 +162,18 @@ class ResourceMonitor:
         if not self.gpu_available:
             return {"gpu_util": 0, "gpu_memory": 0, "gpu_temp": 0}
         
+        if pynvml is not None:
+            return self._get_gpu_stats_nvml()
+        
         try:
+            # Salida numérica: se parsea en bytes, sin decodificar texto
             result = subprocess.run([
-                'nvidia-smi', '--query-gpu=utilization.gpu,memory.used,temperature.gpu',
+                'nvidia-smi', '--id=0', '--query-gpu=utilization.gpu,memory.used,temperature.gpu',
                 '--format=csv,noheader,nounits'
-            ], capture_output=True, text=True)
+            ], capture_output=True)
             
             if result.returncode == 0:
-                gpu_util, gpu_memory, gpu_temp = result.stdout.strip().split(', ')
+                gpu_util, gpu_memory, gpu_temp = result.stdout.strip().split(b', ')
                 return {
                     "gpu_util": float(gpu_util),
                     "gpu_memory": float(gpu_memory),
@@ -71,65 +184,96 @@ class ResourceMonitor:
         
         return {"gpu_util": 0, "gpu_memory": 0, "gpu_temp": 0}
     
+    def _get_gpu_stats_nvml(self) -> Dict[str, float]:
+        """Obtiene estadísticas de GPU vía NVML (sin lanzar procesos)"""
+        handle = self._gpu_handle
+        if handle is None:
+            return {"gpu_util": 0, "gpu_memory": 0, "gpu_temp": 0}
+        
+        try:
+            return {
+                "gpu_util": float(pynvml.nvmlDeviceGetUtilizationRates(handle).gpu),
+                "gpu_memory": float(pynvml.nvmlDeviceGetMemoryInfo(handle).used // 1024**2),
+                "gpu_temp": float(pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU))
+            }
+        except Exception:
+            return {"gpu_util": 0, "gpu_memory": 0, "gpu_temp": 0}
+    
+    def _take_sample(self):
+        """Toma una muestra de todos los recursos"""
+        # interval=None no bloquea: devuelve el uso desde la llamada anterior
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        gpu_stats = self._get_gpu_stats()
+        
+        self._store_sample((
+            cpu_percent,
+            memory.percent,
+            memory.used / (1024**3),
+            gpu_stats["gpu_util"],
+            gpu_stats["gpu_memory"],
+            gpu_stats["gpu_temp"]
+        ))
+    
     def _monitor_loop(self):
-        """Loop principal de monitoreo"""
-        while self.monitoring:
-            timestamp = time.time()
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            gpu_stats = self._get_gpu_stats()
-            
-            self.data.append({
-                "timestamp": timestamp,
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory.percent,
-                "memory_used_gb": memory.used / (1024**3),
-                "memory_total_gb": memory.total / (1024**3),
-                **gpu_stats
-            })
-            
-            time.sleep(2)
+        """Loop principal de monitoreo
+        
+        Cada muestra se toma al final de su intervalo, así el uso de CPU cubre
+        un periodo completo desde la lectura anterior (nunca uno de microsegundos).
+        """
+        # psutil guarda la referencia del contador de CPU por hilo: se fija aquí,
+        # en el hilo que toma las muestras
+        psutil.cpu_percent(interval=None)
+        t0 = time.monotonic()
+        while not self._stop_event.wait(max(0, self.SAMPLE_INTERVAL - (time.monotonic() - t0))):
+            t0 = time.monotonic()
+            self._take_sample()
+        
+        # Ejecución más corta que un intervalo: una única muestra que cubre todo el tramo
+        if self._n == 0:
+            self._take_sample()
     
     def start_monitoring(self):
         """Inicia el monitoreo"""
-        self.monitoring = True
-        self.data = []
+        self._reset_samples()
+        if pynvml is not None and self.gpu_available and self._gpu_handle is None:
+            self.gpu_available = self._nvml_open()
+        self._stop_event = threading.Event()
         self.thread = threading.Thread(target=self._monitor_loop)
         self.thread.start()
     
     def stop_monitoring(self) -> Dict[str, Any]:
         """Detiene el monitoreo y retorna estadísticas"""
-        self.monitoring = False
         if hasattr(self, 'thread'):
+            self._stop_event.set()
             self.thread.join()
+        self._nvml_close()
         
-        if not self.data:
+        if self._n == 0:
             return {}
         
-        cpu_values = [d["cpu_percent"] for d in self.data]
-        memory_values = [d["memory_percent"] for d in self.data]
-        gpu_util_values = [d["gpu_util"] for d in self.data]
-        gpu_memory_values = [d["gpu_memory"] for d in self.data]
+        cpu, memory, memory_gb, gpu_util, gpu_memory, _ = self._samples[:, :self._n]
         
         return {
-            "duration": len(self.data) * 2,
+            "duration": self._n * self.SAMPLE_INTERVAL,
             "cpu": {
-                "avg": statistics.mean(cpu_values),
-                "max": max(cpu_values),
-                "min": min(cpu_values)
+                "avg": float(cpu.mean()),
+                "max": float(cpu.max()),
+                "min": float(cpu.min())
             },
             "memory": {
-                "avg": statistics.mean(memory_values),
-                "max": max(memory_values),
-                "min": min(memory_values),
-                "peak_gb": max([d["memory_used_gb"] for d in self.data])
+                "avg": float(memory.mean()),
+                "max": float(memory.max()),
+                "min": float(memory.min()),
+                "peak_gb": float(memory_gb.max()),
+                "total_gb": self._mem_total_gb
             },
             "gpu": {
                 "available": self.gpu_available,
-                "util_avg": statistics.mean(gpu_util_values) if gpu_util_values else 0,
-                "util_max": max(gpu_util_values) if gpu_util_values else 0,
-                "memory_avg": statistics.mean(gpu_memory_values) if gpu_memory_values else 0,
-                "memory_max": max(gpu_memory_values) if gpu_memory_values else 0
+                "util_avg": float(gpu_util.mean()),
+                "util_max": float(gpu_util.max()),
+                "memory_avg": float(gpu_memory.mean()),
+                "memory_max": float(gpu_memory.max())
             }
         }
 
@@ -140,40 +284,74 @@ if __name__ == "__main__":
 class TTSModelTester:
     """Tester para un modelo TTS específico con captura de audio"""
     
-    def __init__(self, name: str, port: int, directory: str):
+    # Pruebas de síntesis con su payload ya construido (iguales para todos los modelos)
+    SYNTHESIS_TESTS = tuple(
+        {"name": name, "text": text, "payload": {"text": text, **params}}
+        for name, text, params in (
+            ("synthesis_basic",
+             "Hola, esta es una prueba de síntesis de voz básica.",
+             {"language": "es"}),
+            ("synthesis_long",
+             "Esta es una prueba más larga para evaluar el rendimiento con textos extensos. La síntesis de texto a voz es una tecnología fascinante.",
+             {"language": "es"})
+        )
+    )
+    
+    def __init__(self, name: str, port: int, directory: str, base_dir: Optional[Path] = None):
         self.name = name
         self.port = port
         self.directory = directory
+        # Ruta absoluta del proyecto: nunca dependemos del directorio actual del proceso
+        self.workdir = (base_dir or Path.cwd().resolve()) / directory
         self.base_url = f"http://localhost:{port}"
+        self.synthesize_url = f"{self.base_url}/synthesize_json"
+        self._health_body = None  # cuerpo del último /health correcto
         self.results = {}
         self.audio_files = []
+        self._audio_dir_cache = {"mtime": 0, "entries": []}
+        
+        # Sesión HTTP reutilizable (keep-alive) para todas las peticiones al servicio
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.headers.update({"Connection": "keep-alive"})
+        
+        # Proyecto compose del modelo (para consultar sus contenedores al daemon)
+        self._compose_project = self.workdir.name.lower()
         
     def start_service(self) -> bool:
         """Levanta el servicio Docker"""
         try:
             print(f"🚀 Iniciando {self.name}...")
-            original_dir = os.getcwd()
-            os.chdir(self.directory)
-            
+            self._health_body = None
             result = subprocess.run(
                 ['docker', 'compose', 'up', '-d'],
-                capture_output=True, text=True
+                capture_output=True, text=True, cwd=self.workdir
             )
             
-            os.chdir(original_dir)
-            
             if result.returncode != 0:
                 print(f"❌ Error iniciando {self.name}: {result.stderr}")
                 return False
             
-            # Esperar a que el servicio esté listo
+            # Esperar a que el servicio esté listo (backoff 0.2s -> 2s)
             max_wait = 120
-            for attempt in range(max_wait // 5):
-                time.sleep(5)
+            start = time.monotonic()
+            deadline = start + max_wait
+            delay = 0.2
+            next_report = 5
+            while time.monotonic() < deadline:
+                # El daemon solo sirve para abortar pronto; la disponibilidad la decide /health
+                if self._container_exited():
+                    print(f"❌ El contenedor de {self.name} se detuvo durante el arranque")
+                    return False
                 if self._check_health():
                     print(f"✅ {self.name} iniciado correctamente")
                     return True
-                print(f"⏳ Esperando {self.name}... ({(attempt + 1) * 5}s)")
+                time.sleep(delay)
+                delay = min(delay * 1.5, 2.0)
+                elapsed = time.monotonic() - start
+                if elapsed >= next_report:
+                    print(f"⏳ Esperando {self.name}... ({elapsed:.0f}s)")
+                    next_report += 5
             
             print(f"❌ {self.name} no se inició en el tiempo esperado")
             return False
@@ -186,41 +364,81 @@ class TTSModelTester:
         """Detiene el servicio Docker"""
         try:
             print(f"🛑 Deteniendo {self.name}...")
-            original_dir = os.getcwd()
-            os.chdir(self.directory)
-            subprocess.run(['docker', 'compose', 'down'], capture_output=True)
-            os.chdir(original_dir)
+            subprocess.run(['docker', 'compose', 'down'], capture_output=True, cwd=self.workdir)
+            self.session.close()
             time.sleep(5)
         except Exception as e:
             print(f"⚠️ Error deteniendo {self.name}: {e}")
     
+    def _container_exited(self) -> bool:
+        """Indica si algún contenedor del modelo ha terminado con error según el daemon de Docker
+        
+        Devuelve False si el SDK no está disponible o no se encuentran contenedores
+        del proyecto: en ese caso solo cuenta el endpoint /health.
+        """
+        client = _docker_client()
+        if client is None:
+            return False
+        
+        try:
+            containers = client.containers.list(
+                all=True,
+                filters={"label": f"com.docker.compose.project={self._compose_project}"}
+            )
+        except Exception:
+            return False
+        
+        for container in containers:
+            state = container.attrs.get("State", {})
+            # Un contenedor auxiliar que terminó con código 0 no cuenta como fallo
+            if state.get("Status") == "dead" or (state.get("Status") == "exited" and state.get("ExitCode")):
+                return True
+        return False
+    
     def _check_health(self) -> bool:
         """Verifica si el servicio está saludable"""
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=10)
-            return response.status_code == 200
+            response = self.session.get(f"{self.base_url}/health", timeout=1.0)
+            if response.status_code != 200:
+                return False
+            self._health_body = response.content
+            return True
         except:
             return False
     
-    def _capture_audio_files(self, test_name: str) -> List[str]:
-        """Captura archivos de audio generados recientemente"""
-        debug_audio_path = os.path.join(self.directory, "debug_audio")
-        if not os.path.exists(debug_audio_path):
+    def _scan_audio_dir(self) -> List[tuple]:
+        """Lista (mtime, ruta) de los WAV en debug_audio, reutilizando el último listado si el directorio no cambió"""
+        debug_audio_path = os.path.join(self.workdir, "debug_audio")
+        try:
+            dir_mtime = os.stat(debug_audio_path).st_mtime_ns
+        except OSError:
             return []
         
-        # Buscar archivos WAV recientes (últimos 30 segundos)
-        current_time = time.time()
-        recent_files = []
+        if dir_mtime == self._audio_dir_cache["mtime"]:
+            return self._audio_dir_cache["entries"]
+        
+        # scandir cachea el stat de cada entrada: un único stat por archivo
+        entries = []
+        with os.scandir(debug_audio_path) as it:
+            for entry in it:
+                if entry.name.endswith(".wav"):
+                    entries.append((entry.stat().st_mtime, entry.path))
         
-        for file_path in glob.glob(os.path.join(debug_audio_path, "*.wav")):
-            file_mtime = os.path.getmtime(file_path)
-            if current_time - file_mtime < 30:  # Archivos de los últimos 30 segundos
-                recent_files.append(file_path)
+        self._audio_dir_cache = {"mtime": dir_mtime, "entries": entries}
+        return entries
+    
+    def _latest_audio_mtime(self) -> float:
+        """mtime del WAV más reciente en debug_audio (0 si no hay ninguno)"""
+        return max((mtime for mtime, _ in self._scan_audio_dir()), default=0)
+    
+    def _capture_audio_files(self, test_name: str, since: float) -> List[str]:
+        """Captura los archivos de audio generados después de `since`"""
+        recent_files = [(mtime, path) for mtime, path in self._scan_audio_dir() if mtime > since]
         
         # Ordenar por tiempo de modificación (más reciente primero)
-        recent_files.sort(key=os.path.getmtime, reverse=True)
+        recent_files.sort(reverse=True)
         
-        return recent_files[:2]  # Máximo 2 archivos más recientes
+        return [path for _, path in recent_files[:2]]  # Máximo 2 archivos más recientes
     
     def run_tests(self) -> Dict[str, Any]:
         """Ejecuta las pruebas del modelo"""
@@ -241,10 +459,14 @@ class TTSModelTester:
     
     def _get_health_info(self) -> Dict[str, Any]:
         """Obtiene información de salud del servicio"""
+        # Se reutiliza la respuesta que dio por listo al servicio en start_service
+        body, self._health_body = self._health_body, None
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=10)
+            if body is not None:
+                return _json_loads(body)
+            response = self.session.get(f"{self.base_url}/health", timeout=(1.0, 10))
             if response.status_code == 200:
-                return response.json()
+                return _json_loads(response.content)
         except Exception as e:
             print(f"⚠️ Error obteniendo health de {self.name}: {e}")
         return {}
@@ -256,9 +478,9 @@ class TTSModelTester:
             
             for endpoint in endpoints:
                 try:
-                    response = requests.get(f"{self.base_url}{endpoint}", timeout=10)
+                    response = self.session.get(f"{self.base_url}{endpoint}", timeout=(1.0, 10))
                     if response.status_code == 200:
-                        return response.json()
+                        return _json_loads(response.content)
                 except:
                     continue
         except Exception as e:
@@ -267,45 +489,34 @@ class TTSModelTester:
     
     def _run_synthesis_tests(self) -> Dict[str, Any]:
         """Ejecuta pruebas de síntesis básicas"""
-        tests = [
-            {
-                "name": "synthesis_basic",
-                "text": "Hola, esta es una prueba de síntesis de voz básica.",
-                "params": {"language": "es"}
-            },
-            {
-                "name": "synthesis_long",
-                "text": "Esta es una prueba más larga para evaluar el rendimiento con textos extensos. La síntesis de texto a voz es una tecnología fascinante.",
-                "params": {"language": "es"}
-            }
-        ]
-        
         results = {}
         
-        for test in tests:
+        for test in self.SYNTHESIS_TESTS:
             try:
                 print(f"🎤 Ejecutando síntesis: {test['name']}")
-                start_time = time.time()
-                
-                payload = {
-                    "text": test["text"],
-                    **test["params"]
-                }
+                # Solo se capturan los audios posteriores a este punto
+                audio_since = self._latest_audio_mtime()
+                start_time = time.perf_counter()
                 
-                response = requests.post(
-                    f"{self.base_url}/synthesize_json",
-                    json=payload,
+                response = self.session.post(
+                    self.synthesize_url,
+                    json=test["payload"],
                     timeout=60
                 )
                 
-                end_time = time.time()
+                end_time = time.perf_counter()
                 response_time = end_time - start_time
                 
                 # Capturar archivos de audio generados
-                audio_files = self._capture_audio_files(test["name"])
+                audio_files = self._capture_audio_files(test["name"], audio_since)
                 
                 if response.status_code == 200:
-                    result_data = response.json()
+                    # Solo se parsea si es JSON; un cuerpo de audio no se decodifica
+                    content_type = response.headers.get('Content-Type', '')
+                    if content_type.startswith('application/json'):
+                        result_data = _json_loads(response.content)
+                    else:
+                        result_data = {"content_type": content_type, "size": len(response.content)}
                     results[test["name"]] = {
                         "success": True,
                         "response_time": response_time,
@@ -342,36 +553,62 @@ class TTSModelTester:
         
         return results
     
+    @staticmethod
+    def _read_tail(pipe, tail: deque, limit: int):
+        """Consume un pipe línea a línea guardando como mucho los últimos `limit` caracteres"""
+        size = 0
+        with pipe:
+            for line in pipe:
+                tail.append(line)
+                size += len(line)
+                while size - len(tail[0]) >= limit:
+                    size -= len(tail.popleft())
+    
     def _run_test_script(self) -> Dict[str, Any]:
         """Ejecuta el script de prueba del modelo si existe"""
-        test_script = os.path.join(self.directory, "test_service.py")
+        test_script = os.path.join(self.workdir, "test_service.py")
         
         if not os.path.exists(test_script):
             return {"available": False}
         
         try:
             print(f"📋 Ejecutando script de prueba de {self.name}...")
-            start_time = time.time()
-            
-            original_dir = os.getcwd()
-            os.chdir(self.directory)
+            start_time = time.perf_counter()
             
-            result = subprocess.run(
+            process = subprocess.Popen(
                 [sys.executable, 'test_service.py'],
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=300
+                cwd=self.workdir
             )
             
-            os.chdir(original_dir)
-            end_time = time.time()
+            # Se leen ambos pipes en paralelo conservando solo el final de la salida
+            stdout_tail, stderr_tail = deque(), deque()
+            readers = [
+                threading.Thread(target=self._read_tail, args=(process.stdout, stdout_tail, 2000)),
+                threading.Thread(target=self._read_tail, args=(process.stderr, stderr_tail, 1000))
+            ]
+            for reader in readers:
+                reader.start()
+            
+            try:
+                returncode = process.wait(timeout=300)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                for reader in readers:
+                    reader.join()
+            
+            end_time = time.perf_counter()
             
             return {
                 "available": True,
-                "success": result.returncode == 0,
+                "success": returncode == 0,
                 "duration": end_time - start_time,
-                "stdout": result.stdout[-2000:] if result.stdout else "",
-                "stderr": result.stderr[-1000:] if result.stderr else ""
+                "stdout": "".join(stdout_tail)[-2000:],
+                "stderr": "".join(stderr_tail)[-1000:]
             }
             
         except subprocess.TimeoutExpired:
@@ -387,129 +624,53 @@ class TTSModelTester:
                 "error": str(e)
             }
 
-class ReportGenerator:
-    """Generador de reportes HTML con reproductores de audio"""
-    
-    def __init__(self, output_dir: str):
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
-        self.audio_dir = self.output_dir / "audio"
-        self.audio_dir.mkdir(exist_ok=True)
-        
-    def generate_report(self, comparison_data: Dict[str, Any]):
-        """Genera el reporte HTML completo con audio"""
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        report_file = self.output_dir / f"tts_comparison_report_{timestamp}.html"
-        
-        # Copiar archivos de audio al directorio de reportes
-        self._copy_audio_files(comparison_data)
-        
-        html_content = self._generate_html(comparison_data)
-        
-        with open(report_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        # También generar JSON con datos raw
-        json_file = self.output_dir / f"tts_comparison_data_{timestamp}.json"
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(comparison_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"📄 Reporte con audio generado: {report_file}")
-        print(f"📊 Datos JSON: {json_file}")
-        print(f"🎵 Archivos de audio en: {self.audio_dir}")
-        
-        return str(report_file)
-    
-    def _copy_audio_files(self, comparison_data: Dict[str, Any]):
-        """Copia archivos de audio al directorio de reportes"""
-        audio_counter = 0
-        
-        for model_name, model_data in comparison_data.get('models', {}).items():
-            if model_data.get('status') != 'completed':
-                continue
-                
-            audio_files = model_data.get('test_results', {}).get('audio_files', [])
-            
-            for audio_info in audio_files:
-                source_file = audio_info.get('file')
-                if source_file and os.path.exists(source_file):
-                    audio_counter += 1
-                    
-                    # Crear nombre descriptivo
-                    model_safe = model_name.replace(' ', '_').replace('-', '_').lower()
-                    test_name = audio_info.get('test', 'unknown')
-                    
-                    dest_filename = f"{audio_counter:02d}_{model_safe}_{test_name}.wav"
-                    dest_path = self.audio_dir / dest_filename
-                    
-                    try:
-                        shutil.copy2(source_file, dest_path)
-                        audio_info['copied_file'] = dest_filename
-                        print(f"🎵 Audio copiado: {dest_filename}")
-                    except Exception as e:
-                        print(f"⚠️ Error copiando audio {source_file}: {e}")
-    
-    def _generate_html(self, data: Dict[str, Any]) -> str:
-        """Genera el contenido HTML del reporte"""
-        timestamp = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        
-        # Generar tabla de resumen
-        summary_table = self._generate_summary_table(data)
-        
-        # Generar análisis detallado
-        detailed_analysis = self._generate_detailed_analysis(data)
-        
-        # Generar análisis de recursos
-        resource_analysis = self._generate_resource_table(data)
-        
-        # Generar sección de audio
-        audio_section = self._generate_audio_section(data)
-        
-        return f"""<!DOCTYPE html>
+# Esqueleto del reporte HTML, compilado una sola vez al importar el módulo.
+# El reporte se escribe por partes: prefijo estático, fecha, secciones y cola estática.
+_REPORT_PREFIX = """<!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Reporte de Comparación TTS con Audio</title>
     <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333; background: #f5f5f5; }}
-        .container {{ max-width: 1200px; margin: 0 auto; padding: 20px; }}
-        .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; margin-bottom: 30px; text-align: center; }}
-        .header h1 {{ font-size: 2.5em; margin-bottom: 10px; }}
-        .header p {{ font-size: 1.2em; opacity: 0.9; }}
-        .section {{ background: white; padding: 25px; margin-bottom: 25px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-        .section h2 {{ color: #2c3e50; margin-bottom: 20px; padding-bottom: 10px; border-bottom: 3px solid #3498db; }}
-        .grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; }}
-        .detailed-analysis {{ display: flex; flex-direction: column; gap: 20px; }}
-        .model-card {{ background: #f8f9fa; padding: 20px; border-radius: 8px; border-left: 4px solid #3498db; }}
-        .model-card-full {{ background: #f8f9fa; padding: 20px; border-radius: 8px; border-left: 4px solid #3498db; width: 100%; margin-bottom: 20px; }}
-        .model-content {{ display: grid; grid-template-columns: 1fr 1fr; gap: 30px; align-items: stretch; min-height: 400px; }}
-        .model-metrics {{ display: flex; flex-direction: column; }}
-        .model-output {{ display: flex; flex-direction: column; height: 100%; }}
-        .model-output .metric {{ display: flex; flex-direction: column; height: 100%; }}
-        .model-output .code {{ flex: 1; min-height: 300px; max-height: none; overflow-y: auto; }}
-        .model-card h3 {{ color: #2c3e50; margin-bottom: 15px; }}
-        .metric {{ margin: 10px 0; }}
-        .metric-label {{ font-weight: bold; color: #34495e; }}
-        .metric-value {{ color: #27ae60; font-weight: bold; }}
-        .status-ok {{ color: #27ae60; }}
-        .status-error {{ color: #e74c3c; }}
-        table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-        th, td {{ padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }}
-        th {{ background-color: #3498db; color: white; }}
-        tr:nth-child(even) {{ background-color: #f2f2f2; }}
-        .badge {{ padding: 4px 8px; border-radius: 4px; font-size: 0.9em; font-weight: bold; }}
-        .badge-success {{ background: #d4edda; color: #155724; }}
-        .badge-error {{ background: #f8d7da; color: #721c24; }}
-        .code {{ font-family: monospace; background: #f4f4f4; padding: 10px; border-radius: 4px; white-space: pre-wrap; max-height: 200px; overflow-y: auto; }}
-        .audio-player {{ margin: 10px 0; padding: 15px; background: #f1f3f4; border-radius: 8px; border: 1px solid #e0e0e0; }}
-        .audio-player h4 {{ color: #2c3e50; margin-bottom: 8px; font-size: 1em; }}
-        .audio-player p {{ color: #666; font-size: 0.9em; margin-bottom: 10px; }}
-        .audio-player audio {{ width: 100%; margin-top: 5px; }}
-        .audio-section {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(400px, 1fr)); gap: 20px; }}
-        .audio-model {{ background: #f8f9fa; padding: 20px; border-radius: 8px; border-left: 4px solid #e74c3c; }}
-        .text-sample {{ background: #fff; padding: 10px; border-radius: 4px; border: 1px solid #ddd; margin: 5px 0; font-style: italic; color: #555; }}
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333; background: #f5f5f5; }
+        .container { max-width: 1200px; margin: 0 auto; padding: 20px; }
+        .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; margin-bottom: 30px; text-align: center; }
+        .header h1 { font-size: 2.5em; margin-bottom: 10px; }
+        .header p { font-size: 1.2em; opacity: 0.9; }
+        .section { background: white; padding: 25px; margin-bottom: 25px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        .section h2 { color: #2c3e50; margin-bottom: 20px; padding-bottom: 10px; border-bottom: 3px solid #3498db; }
+        .grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; }
+        .detailed-analysis { display: flex; flex-direction: column; gap: 20px; }
+        .model-card { background: #f8f9fa; padding: 20px; border-radius: 8px; border-left: 4px solid #3498db; }
+        .model-card-full { background: #f8f9fa; padding: 20px; border-radius: 8px; border-left: 4px solid #3498db; width: 100%; margin-bottom: 20px; }
+        .model-content { display: grid; grid-template-columns: 1fr 1fr; gap: 30px; align-items: stretch; min-height: 400px; }
+        .model-metrics { display: flex; flex-direction: column; }
+        .model-output { display: flex; flex-direction: column; height: 100%; }
+        .model-output .metric { display: flex; flex-direction: column; height: 100%; }
+        .model-output .code { flex: 1; min-height: 300px; max-height: none; overflow-y: auto; }
+        .model-card h3 { color: #2c3e50; margin-bottom: 15px; }
+        .metric { margin: 10px 0; }
+        .metric-label { font-weight: bold; color: #34495e; }
+        .metric-value { color: #27ae60; font-weight: bold; }
+        .status-ok { color: #27ae60; }
+        .status-error { color: #e74c3c; }
+        table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+        th, td { padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }
+        th { background-color: #3498db; color: white; }
+        tr:nth-child(even) { background-color: #f2f2f2; }
+        .badge { padding: 4px 8px; border-radius: 4px; font-size: 0.9em; font-weight: bold; }
+        .badge-success { background: #d4edda; color: #155724; }
+        .badge-error { background: #f8d7da; color: #721c24; }
+        .code { font-family: monospace; background: #f4f4f4; padding: 10px; border-radius: 4px; white-space: pre-wrap; max-height: 200px; overflow-y: auto; }
+        .audio-player { margin: 10px 0; padding: 15px; background: #f1f3f4; border-radius: 8px; border: 1px solid #e0e0e0; }
+        .audio-player h4 { color: #2c3e50; margin-bottom: 8px; font-size: 1em; }
+        .audio-player p { color: #666; font-size: 0.9em; margin-bottom: 10px; }
+        .audio-player audio { width: 100%; margin-top: 5px; }
+        .audio-section { display: grid; grid-template-columns: repeat(auto-fit, minmax(400px, 1fr)); gap: 20px; }
+        .audio-model { background: #f8f9fa; padding: 20px; border-radius: 8px; border-left: 4px solid #e74c3c; }
+        .text-sample { background: #fff; padding: 10px; border-radius: 4px; border: 1px solid #ddd; margin: 5px 0; font-style: italic; color: #555; }
     </style>
 </head>
 <body>
@@ -518,28 +679,27 @@ class ReportGenerator:
             <h1>🎤 Reporte de Comparación TTS con Audio</h1>
             <p>Análisis Completo de Modelos de Text-to-Speech</p>
             <p>¡Ahora con Reproductores de Audio! 🔊</p>
-            <p>Generado el {timestamp}</p>
-        </div>
-        
-        <div class="section">
-            <h2>📊 Resumen Ejecutivo</h2>
-            {summary_table}
-        </div>
-        
-        <div class="section">
-            <h2>🎵 Muestras de Audio por Modelo</h2>
-            {audio_section}
-        </div>
-        
-        <div class="section">
-            <h2>🔍 Análisis Detallado por Modelo</h2>
-            {detailed_analysis}
-        </div>
+            <p>Generado el """
+
+_REPORT_HEADER_CLOSE = """</p>
+        </div>"""
+
+_SECTION_OPEN = string.Template("""
         
         <div class="section">
-            <h2>💻 Análisis de Recursos</h2>
-            {resource_analysis}
-        </div>
+            <h2>${title}</h2>
+            """)
+
+# Cabeceras de sección ya evaluadas (los títulos son fijos)
+_SECTION_SUMMARY = _SECTION_OPEN.substitute(title="📊 Resumen Ejecutivo")
+_SECTION_AUDIO = _SECTION_OPEN.substitute(title="🎵 Muestras de Audio por Modelo")
+_SECTION_DETAILED = _SECTION_OPEN.substitute(title="🔍 Análisis Detallado por Modelo")
+_SECTION_RESOURCES = _SECTION_OPEN.substitute(title="💻 Análisis de Recursos")
+
+_SECTION_CLOSE = """
+        </div>"""
+
+_REPORT_TAIL = """
         
         <div class="section">
             <h2>🎯 Recomendaciones</h2>
@@ -565,25 +725,291 @@ class ReportGenerator:
     </div>
 </body>
 </html>"""
+
+# Cabeceras y cierre de las tablas del reporte
+_SUMMARY_TABLE_OPEN = """
+        <table>
+            <thead>
+                <tr>
+                    <th>Modelo</th>
+                    <th>Estado</th>
+                    <th>Tiempo Pruebas</th>
+                    <th>Resp. Promedio</th>
+                    <th>CPU Promedio</th>
+                    <th>GPU Máxima</th>
+                    <th>Muestras Audio</th>
+                </tr>
+            </thead>
+            <tbody>
+                """
+
+_RESOURCE_TABLE_OPEN = """
+        <table>
+            <thead>
+                <tr>
+                    <th>Modelo</th>
+                    <th>CPU Promedio</th>
+                    <th>CPU Máximo</th>
+                    <th>RAM Promedio</th>
+                    <th>RAM Pico</th>
+                    <th>GPU Promedio</th>
+                    <th>GPU Máximo</th>
+                    <th>VRAM Máximo</th>
+                </tr>
+            </thead>
+            <tbody>
+                """
+
+_TABLE_CLOSE = """
+            </tbody>
+        </table>
+        """
+
+# Métricas de la tarjeta de cada modelo en el análisis detallado
+_MODEL_CARD_LABELS = (
+    "Estado del Servicio:",
+    "Modelo:",
+    "Tiempo de Respuesta:",
+    "Pruebas Síntesis:",
+    "Muestras de Audio:",
+    "Script de Prueba:",
+    "CPU Promedio:",
+    "GPU Máxima:"
+)
+
+# Apertura de cada bloque de métrica con su etiqueta ya insertada: por tarjeta
+# solo se escriben la clase CSS y el valor, sin analizar ninguna plantilla
+_METRIC_OPENERS = tuple(
+    """
+                        <div class="metric">
+                            <span class="metric-label">""" + label + """</span>
+                            <span class=\""""
+    for label in _MODEL_CARD_LABELS
+)
+_METRIC_CLOSE = """</span>
+                        </div>"""
+
+# Clases CSS de las tarjetas y badges, compuestas una sola vez
+_METRIC_VALUE = "metric-value"
+_METRIC_VALUE_OK = "metric-value status-ok"
+_METRIC_VALUE_ERR = "metric-value status-error"
+_BADGE_OK = "badge-success"
+_BADGE_ERR = "badge-error"
+
+# (clase CSS, texto) según el resultado del script de prueba
+_SUMMARY_STATUS = {True: (_BADGE_OK, "ÉXITO"), False: (_BADGE_ERR, "FALLO")}
+_SCRIPT_STATUS = {True: (_METRIC_VALUE_OK, "ÉXITO"), False: (_METRIC_VALUE_ERR, "FALLO")}
+
+# Fila de la tabla de recursos: una sola operación de formato por modelo
+_RESOURCE_ROW = """
+            <tr>
+                <td><strong>{name}</strong></td>
+                <td>{r.cpu_avg:.1f}%</td>
+                <td>{r.cpu_max:.1f}%</td>
+                <td>{r.mem_avg:.1f}%</td>
+                <td>{r.mem_peak_gb:.1f} GB</td>
+                <td>{r.gpu_avg:.1f}%</td>
+                <td>{r.gpu_max:.1f}%</td>
+                <td>{r.vram_max:.0f} MB</td>
+            </tr>
+            """
+
+# Escapado HTML en una sola pasada en C (html.escape encadena cinco replace)
+_HTML_ESCAPE = str.maketrans({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'
+})
+
+def _escape_html(value: Any) -> str:
+    """Escapa texto proveniente de los servicios antes de insertarlo en el HTML"""
+    return str(value).translate(_HTML_ESCAPE)
+
+def _dig(data: Dict[str, Any], *keys: str, default: Any = 0) -> Any:
+    """Recorre claves anidadas devolviendo `default` si falta alguna"""
+    try:
+        for key in keys:
+            data = data[key]
+        return data
+    except (KeyError, TypeError):
+        return default
+
+@dataclass
+class ResourceView:
+    """Vista plana de las estadísticas de recursos de un modelo"""
+    __slots__ = ("cpu_avg", "cpu_max", "mem_avg", "mem_peak_gb", "gpu_avg", "gpu_max", "vram_max")
     
-    def _generate_audio_section(self, data: Dict[str, Any]) -> str:
-        """Genera la sección de muestras de audio"""
-        models = data.get('models', {})
+    cpu_avg: float
+    cpu_max: float
+    mem_avg: float
+    mem_peak_gb: float
+    gpu_avg: float
+    gpu_max: float
+    vram_max: float
+    
+    @classmethod
+    def from_resources(cls, resources: Dict[str, Any]) -> "ResourceView":
+        """Construye la vista a partir del dict devuelto por ResourceMonitor"""
+        cpu = resources.get('cpu', {})
+        memory = resources.get('memory', {})
+        gpu = resources.get('gpu', {})
+        return cls(
+            cpu_avg=cpu.get('avg', 0),
+            cpu_max=cpu.get('max', 0),
+            mem_avg=memory.get('avg', 0),
+            mem_peak_gb=memory.get('peak_gb', 0),
+            gpu_avg=gpu.get('util_avg', 0),
+            gpu_max=gpu.get('util_max', 0),
+            vram_max=gpu.get('memory_max', 0)
+        )
+
+class ReportGenerator:
+    """Generador de reportes HTML con reproductores de audio"""
+    
+    def __init__(self, output_dir: str):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.audio_dir = self.output_dir / "audio"
+        self.audio_dir.mkdir(exist_ok=True)
         
-        audio_cards = ""
-        for model_name, model_data in models.items():
-            if model_data.get('status') != 'completed':
-                continue
+    def generate_report(self, comparison_data: Dict[str, Any]):
+        """Genera el reporte HTML completo con audio"""
+        # Un único instante para nombres de archivo y fecha mostrada en el reporte
+        generated_at = datetime.datetime.now()
+        timestamp = generated_at.strftime("%Y%m%d_%H%M%S")
+        report_file = self.output_dir / f"tts_comparison_report_{timestamp}.html"
+        
+        # Modelos completados: se filtran una sola vez para todas las secciones
+        completed = self._completed_models(comparison_data)
+        
+        # Copiar archivos de audio al directorio de reportes
+        self._copy_audio_files(completed)
+        
+        # Escrituras atómicas: un lector nunca ve un reporte a medio escribir.
+        # El HTML se vuelca por fragmentos sobre un buffer de 1 MiB
+        with _atomic_open(report_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            self._write_html(comparison_data, completed, generated_at, f)
+        
+        print(f"📄 Reporte con audio generado: {report_file}")
+        
+        # También generar JSON con datos raw
+        self.save_data(comparison_data, timestamp)
+        print(f"🎵 Archivos de audio en: {self.audio_dir}")
+        
+        return str(report_file)
+    
+    def save_data(self, comparison_data: Dict[str, Any], timestamp: Optional[str] = None) -> Path:
+        """Guarda los datos raw de la comparación en JSON"""
+        if timestamp is None:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        json_file = self.output_dir / f"tts_comparison_data_{timestamp}.json"
+        with _atomic_open(json_file) as f:
+            f.write(_json_dumps(comparison_data))
+        
+        print(f"📊 Datos JSON: {json_file}")
+        return json_file
+    
+    @staticmethod
+    def _completed_models(data: Dict[str, Any]) -> List[tuple]:
+        """Devuelve los pares (nombre, datos) de los modelos completados"""
+        return [(name, model_data) for name, model_data in data.get('models', {}).items()
+                if model_data.get('status') == 'completed']
+    
+    @staticmethod
+    def _link_or_copy(source_file: str, dest_path: Path):
+        """Enlaza (hardlink) el archivo si es posible; si no, copia solo el contenido
+        
+        Lanza FileNotFoundError si el origen ya no existe.
+        """
+        for attempt in range(2):
+            try:
+                os.link(source_file, dest_path)
+                return
+            except FileExistsError:
+                if attempt:
+                    raise
+                # Archivo de un reporte anterior con el mismo nombre: se retira y se reintenta
+                os.remove(dest_path)
+            except OSError as e:
+                # Otro sistema de archivos o sin soporte de hardlinks
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                    raise
+                shutil.copyfile(source_file, dest_path)
+                return
+    
+    def _copy_audio_files(self, completed: List[tuple]):
+        """Copia archivos de audio al directorio de reportes"""
+        audio_counter = 0
+        log_lines = []
+        
+        for model_name, model_data in completed:
+            audio_files = _dig(model_data, 'test_results', 'audio_files', default=[])
+            model_safe = model_name.replace(' ', '_').replace('-', '_').lower()
+            
+            for audio_info in audio_files:
+                source_file = audio_info.get('file')
+                if not source_file:
+                    continue
+                
+                # Crear nombre descriptivo
+                test_name = audio_info.get('test', 'unknown')
+                
+                dest_filename = f"{audio_counter + 1:02d}_{model_safe}_{test_name}.wav"
+                dest_path = self.audio_dir / dest_filename
                 
-            audio_files = model_data.get('test_results', {}).get('audio_files', [])
+                # Sin stat previo: un origen inexistente se detecta al enlazar/copiar
+                try:
+                    self._link_or_copy(source_file, dest_path)
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    audio_counter += 1
+                    log_lines.append(f"⚠️ Error copiando audio {source_file}: {e}")
+                    continue
+                
+                audio_counter += 1
+                audio_info['copied_file'] = dest_filename
+                log_lines.append(f"🎵 Audio copiado: {dest_filename}")
+        
+        # Un solo volcado a stdout en lugar de una línea por archivo
+        if log_lines:
+            print("\n".join(log_lines))
+    
+    def _write_html(self, data: Dict[str, Any], completed: List[tuple],
+                    generated_at: datetime.datetime, out: IO[str]):
+        """Escribe el contenido HTML del reporte en `out`"""
+        timestamp = generated_at.strftime("%d/%m/%Y %H:%M:%S")
+        
+        out.write(_REPORT_PREFIX)
+        out.write(timestamp)
+        out.write(_REPORT_HEADER_CLOSE)
+        
+        # Resumen y análisis detallado muestran también los modelos fallidos
+        sections = (
+            (_SECTION_SUMMARY, self._generate_summary_table, data),
+            (_SECTION_AUDIO, self._generate_audio_section, completed),
+            (_SECTION_DETAILED, self._generate_detailed_analysis, data),
+            (_SECTION_RESOURCES, self._generate_resource_table, completed)
+        )
+        for section_open, write_section, section_data in sections:
+            out.write(section_open)
+            write_section(section_data, out)
+            out.write(_SECTION_CLOSE)
+        
+        out.write(_REPORT_TAIL)
+    
+    def _generate_audio_section(self, completed: List[tuple], out: IO[str]):
+        """Genera la sección de muestras de audio"""
+        out.write('<div class="audio-section">')
+        for model_name, model_data in completed:
+            name_html = _escape_html(model_name)
+            audio_files = _dig(model_data, 'test_results', 'audio_files', default=[])
             
             if not audio_files:
-                audio_cards += f"""
+                out.write(f"""
                 <div class="audio-model">
-                    <h3>{model_name}</h3>
+                    <h3>{name_html}</h3>
                     <p>⚠️ No se capturaron archivos de audio para este modelo</p>
                 </div>
-                """
+                """)
                 continue
             
             # Filtrar para mostrar solo 2 tipos de audio: corto y largo
@@ -597,7 +1023,11 @@ class ReportGenerator:
                     if len(unique_audio_files) >= 2:  # Máximo 2 archivos
                         break
             
-            audio_players = ""
+            out.write(f"""
+            <div class="audio-model">
+                <h3>{name_html}</h3>
+                """)
+            
             for audio_info in unique_audio_files:
                 copied_file = audio_info.get('copied_file')
                 if copied_file:
@@ -612,36 +1042,35 @@ class ReportGenerator:
                     
                     text = audio_info.get('text', '')
                     
-                    audio_players += f"""
+                    out.write(f"""
                     <div class="audio-player">
-                        <h4>🎵 {description}</h4>
-                        <div class="text-sample">"{text}"</div>
+                        <h4>🎵 {_escape_html(description)}</h4>
+                        <div class="text-sample">"{_escape_html(text)}"</div>
                         <audio controls preload="metadata">
-                            <source src="audio/{copied_file}" type="audio/wav">
+                            <source src="audio/{_escape_html(copied_file)}" type="audio/wav">
                             Tu navegador no soporta el elemento de audio.
                         </audio>
                     </div>
-                    """
+                    """)
             
-            audio_cards += f"""
-            <div class="audio-model">
-                <h3>{model_name}</h3>
-                {audio_players}
+            out.write("""
             </div>
-            """
+            """)
         
-        return f'<div class="audio-section">{audio_cards}</div>'
+        out.write('</div>')
     
-    def _generate_summary_table(self, data: Dict[str, Any]) -> str:
+    def _generate_summary_table(self, data: Dict[str, Any], out: IO[str]):
         """Genera la tabla de resumen"""
         models = data.get('models', {})
         
-        summary_rows = ""
+        out.write(_SUMMARY_TABLE_OPEN)
+        
         for model_name, model_data in models.items():
+            name_html = _escape_html(model_name)
             if model_data.get('status') != 'completed':
-                summary_rows += f"""
+                out.write(f"""
                 <tr>
-                    <td><strong>{model_name}</strong></td>
+                    <td><strong>{name_html}</strong></td>
                     <td><span class="badge badge-error">FALLÓ</span></td>
                     <td>N/A</td>
                     <td>N/A</td>
@@ -649,16 +1078,17 @@ class ReportGenerator:
                     <td>N/A</td>
                     <td>N/A</td>
                 </tr>
-                """
+                """)
                 continue
                 
             resources = model_data.get('resources', {})
-            test_script = model_data.get('test_results', {}).get('test_script', {})
-            synthesis = model_data.get('test_results', {}).get('synthesis', {})
-            audio_files = model_data.get('test_results', {}).get('audio_files', [])
+            test_results = model_data.get('test_results', {})
+            test_script = test_results.get('test_script', {})
+            synthesis = test_results.get('synthesis', {})
+            audio_files = test_results.get('audio_files', [])
             
-            cpu_avg = resources.get('cpu', {}).get('avg', 0)
-            gpu_max = resources.get('gpu', {}).get('util_max', 0)
+            cpu_avg = _dig(resources, 'cpu', 'avg')
+            gpu_max = _dig(resources, 'gpu', 'util_max')
             duration = test_script.get('duration', 0)
             success = test_script.get('success', False)
             
@@ -674,19 +1104,20 @@ class ReportGenerator:
                         break
             audio_count = unique_audio_count
             
-            # Calcular tiempo de respuesta promedio
-            response_times = []
-            for test_name, test_data in synthesis.items():
+            # Calcular tiempo de respuesta promedio (una sola pasada)
+            total_response = 0
+            response_count = 0
+            for test_data in synthesis.values():
                 if test_data.get('success', False):
-                    response_times.append(test_data.get('response_time', 0))
-            avg_response = statistics.mean(response_times) if response_times else 0
+                    total_response += test_data.get('response_time', 0)
+                    response_count += 1
+            avg_response = total_response / response_count if response_count else 0
             
-            status_badge = 'badge-success' if success else 'badge-error'
-            status_text = 'ÉXITO' if success else 'FALLO'
+            status_badge, status_text = _SUMMARY_STATUS[bool(success)]
             
-            summary_rows += f"""
+            out.write(f"""
             <tr>
-                <td><strong>{model_name}</strong></td>
+                <td><strong>{name_html}</strong></td>
                 <td><span class="badge {status_badge}">{status_text}</span></td>
                 <td>{duration:.1f}s</td>
                 <td>{avg_response:.2f}s</td>
@@ -694,42 +1125,26 @@ class ReportGenerator:
                 <td>{gpu_max:.1f}%</td>
                 <td>🎵 {audio_count}</td>
             </tr>
-            """
+            """)
         
-        return f"""
-        <table>
-            <thead>
-                <tr>
-                    <th>Modelo</th>
-                    <th>Estado</th>
-                    <th>Tiempo Pruebas</th>
-                    <th>Resp. Promedio</th>
-                    <th>CPU Promedio</th>
-                    <th>GPU Máxima</th>
-                    <th>Muestras Audio</th>
-                </tr>
-            </thead>
-            <tbody>
-                {summary_rows}
-            </tbody>
-        </table>
-        """
+        out.write(_TABLE_CLOSE)
     
-    def _generate_detailed_analysis(self, data: Dict[str, Any]) -> str:
+    def _generate_detailed_analysis(self, data: Dict[str, Any], out: IO[str]):
         """Genera el análisis detallado"""
         models = data.get('models', {})
         
-        model_cards = ""
+        out.write('<div class="detailed-analysis">')
         for model_name, model_data in models.items():
+            name_html = _escape_html(model_name)
             if model_data.get('status') != 'completed':
-                model_cards += f"""
+                out.write(f"""
                 <div class="model-card-full">
-                    <h3>{model_name}</h3>
+                    <h3>{name_html}</h3>
                     <div class="model-content">
                         <div class="model-metrics">
                             <div class="metric">
                                 <span class="metric-label">Estado:</span>
-                                <span class="status-error">Error: {model_data.get('error', 'No disponible')}</span>
+                                <span class="status-error">Error: {_escape_html(model_data.get('error', 'No disponible'))}</span>
                             </div>
                         </div>
                         <div class="model-output">
@@ -740,14 +1155,15 @@ class ReportGenerator:
                         </div>
                     </div>
                 </div>
-                """
+                """)
                 continue
                 
-            health = model_data.get('test_results', {}).get('health', {})
-            synthesis = model_data.get('test_results', {}).get('synthesis', {})
+            test_results = model_data.get('test_results', {})
+            health = test_results.get('health', {})
+            synthesis = test_results.get('synthesis', {})
             resources = model_data.get('resources', {})
-            test_script = model_data.get('test_results', {}).get('test_script', {})
-            audio_files = model_data.get('test_results', {}).get('audio_files', [])
+            test_script = test_results.get('test_script', {})
+            audio_files = test_results.get('audio_files', [])
             
             # Calcular métricas de síntesis
             basic_test = synthesis.get('synthesis_basic', {})
@@ -757,121 +1173,151 @@ class ReportGenerator:
             
             # Resultado del script de prueba
             script_duration = test_script.get('duration', 0)
-            script_success = test_script.get('success', False)
-            script_stdout = test_script.get('stdout', '')[-500:] if test_script.get('stdout') else 'N/A'
+            script_class, script_text = _SCRIPT_STATUS[bool(test_script.get('success', False))]
+            stdout = test_script.get('stdout')
+            script_stdout = stdout[-500:] if stdout else 'N/A'
             
-            model_cards += f"""
+            out.write(f"""
             <div class="model-card-full">
-                <h3>{model_name}</h3>
+                <h3>{name_html}</h3>
                 <div class="model-content">
-                    <div class="model-metrics">
-                        <div class="metric">
-                            <span class="metric-label">Estado del Servicio:</span>
-                            <span class="metric-value status-ok">{health.get('status', 'unknown')}</span>
-                        </div>
-                        <div class="metric">
-                            <span class="metric-label">Modelo:</span>
-                            <span class="metric-value">{health.get('model', 'N/A')}</span>
-                        </div>
-                        <div class="metric">
-                            <span class="metric-label">Tiempo de Respuesta:</span>
-                            <span class="metric-value">{response_time:.2f}s</span>
-                        </div>
-                        <div class="metric">
-                            <span class="metric-label">Pruebas Síntesis:</span>
-                            <span class="metric-value">{success_count}/{total_tests}</span>
-                        </div>
-                        <div class="metric">
-                            <span class="metric-label">Muestras de Audio:</span>
-                            <span class="metric-value">🎵 {len(audio_files)} archivos capturados</span>
-                        </div>
-                        <div class="metric">
-                            <span class="metric-label">Script de Prueba:</span>
-                            <span class="metric-value {'status-ok' if script_success else 'status-error'}">{script_duration:.1f}s - {'ÉXITO' if script_success else 'FALLO'}</span>
-                        </div>
-                        <div class="metric">
-                            <span class="metric-label">CPU Promedio:</span>
-                            <span class="metric-value">{resources.get('cpu', {}).get('avg', 0):.1f}%</span>
-                        </div>
-                        <div class="metric">
-                            <span class="metric-label">GPU Máxima:</span>
-                            <span class="metric-value">{resources.get('gpu', {}).get('util_max', 0):.1f}%</span>
-                        </div>
+                    <div class="model-metrics">""")
+            
+            metric_values = (
+                (_METRIC_VALUE_OK, _escape_html(health.get('status', 'unknown'))),
+                (_METRIC_VALUE, _escape_html(health.get('model', 'N/A'))),
+                (_METRIC_VALUE, f"{response_time:.2f}s"),
+                (_METRIC_VALUE, f"{success_count}/{total_tests}"),
+                (_METRIC_VALUE, f"🎵 {len(audio_files)} archivos capturados"),
+                (script_class, f"{script_duration:.1f}s - {script_text}"),
+                (_METRIC_VALUE, f"{_dig(resources, 'cpu', 'avg'):.1f}%"),
+                (_METRIC_VALUE, f"{_dig(resources, 'gpu', 'util_max'):.1f}%")
+            )
+            for opener, (css_class, value) in zip(_METRIC_OPENERS, metric_values):
+                out.write(f'{opener}{css_class}">{value}{_METRIC_CLOSE}')
+            
+            out.write(f"""
                     </div>
                     <div class="model-output">
                         <div class="metric">
                             <span class="metric-label">Salida Script (últimas líneas):</span>
-                            <div class="code">{script_stdout}</div>
+                            <div class="code">{_escape_html(script_stdout)}</div>
                         </div>
                     </div>
                 </div>
             </div>
-            """
+            """)
         
-        return f'<div class="detailed-analysis">{model_cards}</div>'
+        out.write('</div>')
     
-    def _generate_resource_table(self, data: Dict[str, Any]) -> str:
+    def _generate_resource_table(self, completed: List[tuple], out: IO[str]):
         """Genera la tabla de recursos"""
-        models = data.get('models', {})
+        out.write(_RESOURCE_TABLE_OPEN)
         
-        resource_rows = ""
-        for model_name, model_data in models.items():
-            if model_data.get('status') != 'completed':
-                continue
-                
-            resources = model_data.get('resources', {})
-            cpu = resources.get('cpu', {})
-            memory = resources.get('memory', {})
-            gpu = resources.get('gpu', {})
-            
-            resource_rows += f"""
-            <tr>
-                <td><strong>{model_name}</strong></td>
-                <td>{cpu.get('avg', 0):.1f}%</td>
-                <td>{cpu.get('max', 0):.1f}%</td>
-                <td>{memory.get('avg', 0):.1f}%</td>
-                <td>{memory.get('peak_gb', 0):.1f} GB</td>
-                <td>{gpu.get('util_avg', 0):.1f}%</td>
-                <td>{gpu.get('util_max', 0):.1f}%</td>
-                <td>{gpu.get('memory_max', 0):.0f} MB</td>
-            </tr>
-            """
+        out.writelines(
+            _RESOURCE_ROW.format(name=_escape_html(model_name), r=ResourceView.from_resources(model_data.get('resources', {})))
+            for model_name, model_data in completed
+        )
         
-        return f"""
-        <table>
-            <thead>
-                <tr>
-                    <th>Modelo</th>
-                    <th>CPU Promedio</th>
-                    <th>CPU Máximo</th>
-                    <th>RAM Promedio</th>
-                    <th>RAM Pico</th>
-                    <th>GPU Promedio</th>
-                    <th>GPU Máximo</th>
-                    <th>VRAM Máximo</th>
-                </tr>
-            </thead>
-            <tbody>
-                {resource_rows}
-            </tbody>
-        </table>
-        """
+        out.write(_TABLE_CLOSE)
 
 class TTSComparison:
     """Clase principal para ejecutar la comparación completa con audio"""
     
-    def __init__(self):
+    def __init__(self, caps: Optional[Capabilities] = None):
+        self.caps = caps if caps is not None else get_capabilities()
+        self.base_dir = Path.cwd().resolve()
         self.models = {
-            "Azure TTS": TTSModelTester("Azure TTS", 5004, "azure-tts-ms"),
-            "F5-TTS": TTSModelTester("F5-TTS", 5005, "f5-tts-ms"),
-            "Kokoro TTS": TTSModelTester("Kokoro TTS", 5002, "kokoro-tts-ms"),
-            "XTTS-v2": TTSModelTester("XTTS-v2", 5001, "xtts-v2-tts-ms")
+            "Azure TTS": TTSModelTester("Azure TTS", 5004, "azure-tts-ms", self.base_dir),
+            "F5-TTS": TTSModelTester("F5-TTS", 5005, "f5-tts-ms", self.base_dir),
+            "Kokoro TTS": TTSModelTester("Kokoro TTS", 5002, "kokoro-tts-ms", self.base_dir),
+            "XTTS-v2": TTSModelTester("XTTS-v2", 5001, "xtts-v2-tts-ms", self.base_dir)
+        }
+        
+        self.output_dir = self.base_dir / "tts_comparison_reports"
+        # Crea una sola vez los directorios de reportes y audio
+        self.report_generator = ReportGenerator(self.output_dir)
+        
+    def _run_single(self, model_name: str, tester: TTSModelTester, before_measure=None) -> Dict[str, Any]:
+        """Levanta y prueba un modelo midiendo recursos; no detiene el servicio"""
+        print(f"\n🎯 PROCESANDO: {model_name}")
+        print("-" * 40)
+        
+        # Inicializar monitor de recursos
+        monitor = ResourceMonitor(gpu_available=self.caps.has_gpu)
+        
+        # Iniciar servicio
+        if not tester.start_service():
+            return {
+                "status": "failed_to_start",
+                "error": "No se pudo iniciar el servicio"
+            }
+        
+        if before_measure is not None:
+            before_measure()
+        
+        # Iniciar monitoreo de recursos
+        monitor.start_monitoring()
+        
+        # Ejecutar pruebas
+        test_results = tester.run_tests()
+        
+        # Detener monitoreo
+        resource_stats = monitor.stop_monitoring()
+        
+        print(f"✅ {model_name} completado")
+        return {
+            "status": "completed",
+            "test_results": test_results,
+            "resources": resource_stats
         }
+    
+    def _run_and_stop(self, model_name: str, tester: TTSModelTester) -> Dict[str, Any]:
+        """Ejecuta un modelo completo y detiene su servicio al terminar"""
+        result = self._run_single(model_name, tester)
+        if result["status"] == "completed":
+            tester.stop_service()
+        return result
+    
+    def _run_serial(self) -> Dict[str, Any]:
+        """Ejecuta los modelos uno tras otro"""
+        results = {}
+        
+        # El apagado de un modelo se solapa con el arranque del siguiente;
+        # la medición no empieza hasta que el apagado anterior ha terminado
+        stopper = ThreadPoolExecutor(max_workers=1)
+        pending_stop = None
         
-        self.output_dir = "tts_comparison_reports"
-        Path(self.output_dir).mkdir(exist_ok=True)
+        def wait_previous_stop():
+            nonlocal pending_stop
+            if pending_stop is not None:
+                pending_stop.result()
+                pending_stop = None
         
-    def run_comparison(self) -> str:
+        try:
+            for model_name, tester in self.models.items():
+                results[model_name] = self._run_single(model_name, tester, wait_previous_stop)
+                
+                # Detener servicio (en segundo plano)
+                if results[model_name]["status"] == "completed":
+                    pending_stop = stopper.submit(tester.stop_service)
+        finally:
+            stopper.shutdown(wait=True)
+        
+        return results
+    
+    def _run_parallel(self) -> Dict[str, Any]:
+        """Ejecuta todos los modelos a la vez (cada uno en su puerto)"""
+        with ThreadPoolExecutor(max_workers=len(self.models)) as executor:
+            futures = {
+                model_name: executor.submit(self._run_and_stop, model_name, tester)
+                for model_name, tester in self.models.items()
+            }
+            # Se conserva el orden de self.models en el reporte
+            return {model_name: future.result() for model_name, future in futures.items()}
+    
+    def run_comparison(self, parallel: bool = False, html_report: bool = True,
+                       json_out: Optional[str] = None) -> str:
         """Ejecuta la comparación completa con captura de audio"""
         print("🚀 INICIANDO COMPARACIÓN COMPLETA DE MODELOS TTS CON AUDIO")
         print("=" * 70)
@@ -882,55 +1328,31 @@ class TTSComparison:
             "summary": {}
         }
         
-        original_dir = os.getcwd()
+        # En paralelo las métricas de CPU/GPU son del sistema completo y se mezclan
+        # entre modelos, por eso el modo por defecto sigue siendo secuencial
+        if parallel:
+            print("⚡ Modo paralelo: los recursos medidos incluyen todos los modelos")
+            comparison_data["models"] = self._run_parallel()
+        else:
+            comparison_data["models"] = self._run_serial()
         
-        try:
-            for model_name, tester in self.models.items():
-                print(f"\n🎯 PROCESANDO: {model_name}")
-                print("-" * 40)
-                
-                # Cambiar al directorio del proyecto
-                os.chdir(original_dir)
-                
-                # Inicializar monitor de recursos
-                monitor = ResourceMonitor()
-                
-                # Iniciar servicio
-                if not tester.start_service():
-                    comparison_data["models"][model_name] = {
-                        "status": "failed_to_start",
-                        "error": "No se pudo iniciar el servicio"
-                    }
-                    continue
-                
-                # Iniciar monitoreo de recursos
-                monitor.start_monitoring()
-                
-                # Ejecutar pruebas
-                test_results = tester.run_tests()
-                
-                # Detener monitoreo
-                resource_stats = monitor.stop_monitoring()
-                
-                # Detener servicio
-                tester.stop_service()
-                
-                # Guardar resultados
-                comparison_data["models"][model_name] = {
-                    "status": "completed",
-                    "test_results": test_results,
-                    "resources": resource_stats
-                }
-                
-                print(f"✅ {model_name} completado")
+        if html_report:
+            # Generar reporte con audio
+            print("\n📄 GENERANDO REPORTE CON AUDIO...")
+            report_file = self.report_generator.generate_report(comparison_data)
+        else:
+            # Sin reporte HTML no se copian audios ni se renderiza nada: solo los datos
+            report_file = str(self.report_generator.save_data(comparison_data))
         
-        finally:
-            os.chdir(original_dir)
-        
-        # Generar reporte con audio
-        print("\n📄 GENERANDO REPORTE CON AUDIO...")
-        report_generator = ReportGenerator(self.output_dir)
-        report_file = report_generator.generate_report(comparison_data)
+        # Salida compacta para scripts/CI; va después del reporte para que un
+        # fallo aquí no haga perder los resultados ya guardados
+        if json_out:
+            try:
+                with _atomic_open(Path(json_out)) as f:
+                    f.write(_json_dumps(comparison_data, compact=True))
+                print(f"📊 Datos JSON compactos: {json_out}")
+            except OSError as e:
+                print(f"⚠️ No se pudo escribir {json_out}: {e}")
         
         print(f"\n🎉 COMPARACIÓN CON AUDIO COMPLETADA")
         print(f"📄 Reporte disponible en: {report_file}")
@@ -939,38 +1361,71 @@ class TTSComparison:
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Comparación de modelos TTS con captura de audio")
+    parser.add_argument(
+        "--parallel", action="store_true",
+        help="probar todos los modelos a la vez (más rápido; recursos y VRAM compartidos)"
+    )
+    parser.add_argument(
+        "--no-report", action="store_true",
+        help="guardar solo los datos JSON, sin reporte HTML ni copia de audios"
+    )
+    parser.add_argument(
+        "--json-out", metavar="RUTA",
+        help="escribir además los resultados en JSON compacto en RUTA"
+    )
+    args = parser.parse_args()
+    
+    # Validar --json-out antes de las pruebas, no tras una ejecución de varios minutos
+    if args.json_out:
+        json_dir = Path(args.json_out).resolve().parent
+        if not json_dir.is_dir() or not os.access(json_dir, os.W_OK):
+            parser.error(f"--json-out: el directorio {json_dir} no existe o no tiene permisos de escritura")
+    
     try:
         print("🎯 Verificando sistema...")
         
+        # Se detectan una sola vez y se reutilizan en toda la ejecución
+        caps = get_capabilities()
+        
         # Verificar Docker
-        try:
-            subprocess.run(['docker', '--version'], capture_output=True, check=True)
+        if caps.docker_version:
             print("✅ Docker disponible")
-        except:
+        else:
             print("❌ Docker no está disponible")
             sys.exit(1)
         
         # Verificar nvidia-smi si hay GPU
-        try:
-            subprocess.run(['nvidia-smi'], capture_output=True, check=True)
+        if caps.has_gpu:
             print("✅ GPU NVIDIA disponible")
-        except:
+        else:
             print("⚠️ GPU NVIDIA no disponible, usando CPU")
         
         # Ejecutar comparación
-        comparison = TTSComparison()
-        report_file = comparison.run_comparison()
+        comparison = TTSComparison(caps)
+        report_file = comparison.run_comparison(
+            parallel=args.parallel,
+            html_report=not args.no_report,
+            json_out=args.json_out
+        )
+        
+        if args.no_report:
+            print("✅ Proceso completado exitosamente")
+            print(f"📊 Datos disponibles en: {report_file}")
+            return
         
         print(f"\n🔗 Para ver el reporte, abre: {report_file}")
         
         # Intentar abrir el reporte automáticamente
         try:
+            # Lanzar el visor desacoplado: no esperamos a que arranque el navegador
+            detached = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
             if sys.platform.startswith('linux'):
-                subprocess.run(['xdg-open', report_file])
+                subprocess.Popen(['xdg-open', report_file], start_new_session=True, **detached)
             elif sys.platform.startswith('darwin'):
-                subprocess.run(['open', report_file])
+                subprocess.Popen(['open', report_file], start_new_session=True, **detached)
             elif sys.platform.startswith('win'):
-                subprocess.run(['start', report_file], shell=True)
+                subprocess.Popen(['start', '', report_file], shell=True, **detached)
         except:
             print("ℹ️ No se pudo abrir el reporte automáticamente")
             
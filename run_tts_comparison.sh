@@ -69,7 +69,7 @@ echo ""
 
 sleep 3
 
-python3 generate_tts_comparison_report.py
+python3 generate_tts_comparison_report.py "$@"
 
 exit_code=$?
 
@@ -6,66 +6,67 @@ Verifica que todos los componentes estén listos antes de la comparación comple
 
 import os
 import sys
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
 
+from capabilities import get_capabilities
+
+# Módulos requeridos; solo se comprueba que estén instalados, sin importarlos
+PYTHON_DEPS = ("requests", "psutil", "numpy")
+
+_caps_future = None
+
+def start_probes(executor):
+    """Lanza la detección de Docker/GPU en segundo plano (siempre fresca, sin caché)"""
+    global _caps_future
+    _caps_future = executor.submit(get_capabilities, 0)
+
+def _caps():
+    """Capacidades detectadas (lanzadas previamente o al momento)"""
+    if _caps_future is not None:
+        return _caps_future.result()
+    return get_capabilities(0)
+
 def check_python_deps():
     """Verifica dependencias de Python"""
-    try:
-        import requests
-        import psutil
+    missing = [name for name in PYTHON_DEPS if find_spec(name) is None]
+    if not missing:
         print("✅ Dependencias Python: OK")
         return True
-    except ImportError as e:
-        print(f"❌ Dependencias Python faltantes: {e}")
-        print("   Ejecuta: pip install -r requirements_comparison.txt")
-        return False
+    print(f"❌ Dependencias Python faltantes: {', '.join(missing)}")
+    print("   Ejecuta: pip install -r requirements_comparison.txt")
+    return False
 
 def check_docker():
     """Verifica Docker"""
-    try:
-        result = subprocess.run(['docker', '--version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"✅ Docker: {result.stdout.strip()}")
-            return True
-        else:
-            print("❌ Docker no disponible")
-            return False
-    except:
-        print("❌ Docker no instalado")
+    docker_version = _caps().docker_version
+    if docker_version:
+        print(f"✅ Docker: {docker_version}")
+        return True
+    else:
+        print("❌ Docker no disponible")
         return False
 
 def check_docker_compose():
     """Verifica Docker Compose"""
-    try:
-        result = subprocess.run(['docker', 'compose', 'version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"✅ Docker Compose: OK")
-            return True
-        else:
-            print("❌ Docker Compose no disponible")
-            return False
-    except:
+    if _caps().compose:
+        print(f"✅ Docker Compose: OK")
+        return True
+    else:
         print("❌ Docker Compose no disponible")
         return False
 
 def check_gpu():
     """Verifica GPU NVIDIA"""
-    try:
-        result = subprocess.run(['nvidia-smi'], capture_output=True, text=True)
-        if result.returncode == 0:
-            # Extraer información básica
-            lines = result.stdout.split('\n')
-            for line in lines:
-                if 'Driver Version' in line:
-                    print(f"✅ GPU NVIDIA: {line.strip()}")
-                    return True
-            print("✅ GPU NVIDIA: Disponible")
-            return True
+    caps = _caps()
+    if caps.has_gpu:
+        if caps.gpu_driver:
+            print(f"✅ GPU NVIDIA: {caps.gpu_driver}")
         else:
-            print("⚠️ GPU NVIDIA: No disponible (usará CPU)")
-            return False
-    except:
+            print("✅ GPU NVIDIA: Disponible")
+        return True
+    else:
         print("⚠️ GPU NVIDIA: No disponible (usará CPU)")
         return False
 
@@ -92,18 +93,45 @@ def check_directories():
 
 def check_ports():
     """Verifica puertos libres"""
+    import errno
+    import select
     import socket
+    import time
     
     ports = [5001, 5002, 5004, 5005]
     busy_ports = []
     
+    # Se lanzan todas las conexiones a la vez (sockets no bloqueantes)
+    pending = {}
     for port in ports:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
         result = sock.connect_ex(('localhost', port))
-        sock.close()
+        
+        if result in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+            pending[sock] = port
+            continue
         
         if result == 0:  # Puerto ocupado
             busy_ports.append(port)
+        sock.close()
+    
+    # Un socket pasa a escribible cuando la conexión se resuelve (aceptada o rechazada)
+    deadline = time.monotonic() + 1.0
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        _, writable, _ = select.select([], list(pending), [], remaining)
+        for sock in writable:
+            port = pending.pop(sock)
+            if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:  # Puerto ocupado
+                busy_ports.append(port)
+            sock.close()
+    
+    for sock in pending:
+        sock.close()
+    busy_ports.sort()
     
     if busy_ports:
         print(f"⚠️ Puertos ocupados: {busy_ports}")
@@ -144,13 +172,17 @@ def main():
     
     results = []
     
-    for name, check_func in checks:
-        try:
-            result = check_func()
-            results.append(result)
-        except Exception as e:
-            print(f"❌ Error verificando {name}: {e}")
-            results.append(False)
+    # La detección de Docker/GPU corre en segundo plano; los resultados se imprimen en orden
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        start_probes(executor)
+        
+        for name, check_func in checks:
+            try:
+                result = check_func()
+                results.append(result)
+            except Exception as e:
+                print(f"❌ Error verificando {name}: {e}")
+                results.append(False)
     
     print("\n" + "=" * 50)
     